@@ -0,0 +1,490 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+import stats
+from simulation import Elevator
+
+
+"""
+Lockstep NumPy engine for Monte-Carlo studies of a small building.
+
+Thousands of independent replications of the same building are held as flat arrays and advanced together from one
+event time to the next: the earliest of the next arrival and the end of any elevator's current activity over all
+replications. The elevators of every replication are handled by the same array operations, elevator e of replication
+r at index e * replications + r. People are not objects here, each floor keeps the arrival times of the people waiting
+to go up and down in first in first out buffers. A person's destination is drawn when they get on, uniform over the
+floors in their direction, which is the same distribution the Building process gives. Each elevator keeps a count of
+its occupants per destination.
+
+The elevators go through the steps of simulation.LookStrategy with the Elevator timings: let people out, stand by
+with the doors as they are when there are no calls, answer a hall call in the direction of travel, also when full,
+with the loading loop of Elevator.load over everyone on the floor, including the people who turn up while it runs,
+close the doors and move on. Calls are kept as bitsets, one int64 per replication. As with LookStrategy a moving
+elevator only gets an event on the levels where its decision can change: the next stop ahead, the last call ahead, a
+new call made in its path or the level after a call it was heading for is answered by another elevator. The length of stay of everyone who gets on is recorded at the start of the loading loop, so the
+per replication results are the columns written by simulation.main().
+"""
+__author__ = "Thomas McDonnell"
+__title__ = "Elevator Simulation"
+
+# elevator phases
+IDLE, MOVING, UNLOADING, OPENING, LOADING, CLOSING = range(6)
+EPS = 1e-9  # events closer than this happen together
+MAX_FLOORS = 62  # calls are int64 bitsets
+
+
+def first_of(keys):
+    """
+    Utility function used to find the first occurrence of every key
+    :param keys: int64 array
+    :return: boolean array, True where the key did not occur before
+    """
+    order = np.argsort(keys, kind="mergesort")
+    first = np.ones(keys.size, dtype=bool)
+    first[order[1:][keys[order[1:]] == keys[order[:-1]]]] = False
+    return first
+
+
+def lowest(calls):
+    """
+    Utility function used to find the lowest level of each non empty bitset of calls, the lowest bit alone is a power
+    of two which a float64 holds exactly
+    :param calls: int64 array
+    :return: int64 array
+    """
+    return np.frexp((calls & -calls).astype(np.float64))[1].astype(np.int64) - 1
+
+
+def highest(calls):
+    """
+    Utility function used to find the highest level of each non empty bitset of calls, by bisection on the bits as
+    a float64 cannot hold bitsets of more than 53 levels exactly
+    :param calls: int64 array
+    :return: int64 array
+    """
+    levels = np.zeros(calls.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        above = (calls >> shift) != 0
+        levels += shift * above
+        calls = np.where(above, calls >> shift, calls)
+    return levels
+
+
+class LockstepEngine:
+    """
+    A class used to simulate many independent replications of one building at once
+
+    Attributes
+    ----------
+    replications:   number of independent buildings
+    num_floors:     number of floors in each building, at most MAX_FLOORS
+    num_elevators:  number of elevators in each building
+    max_load:       maximum occupancy of each elevator default=Elevator.MAX_LOAD
+    iat:            inter arrival time of people in the building default=5
+    t_move, t_open, t_close, t_enter, t_exit: elevator timings, defaults as for Elevator
+
+    row:            (elevators * replications) replication of each elevator
+    position:       (elevators * replications) level of each elevator, the level it left while moving
+    direction:      (elevators * replications) 1:up, -1:down, 0:still
+    target:         (elevators * replications) level of the next event of a moving elevator
+    load:           (elevators * replications) number of occupants
+    phase:          (elevators * replications) IDLE, MOVING, UNLOADING, OPENING, LOADING, CLOSING
+    due:            (elevators * replications) time the current phase ends, inf when idle
+    is_open:        (elevators * replications) True while the doors are open
+    seen:           (elevators * replications) arrivals on the floor counted by the loading loop so far
+    car_calls:      (elevators * replications) bitset of the levels with riders, bit n set for level n
+    riders:         (elevators * replications * floors) occupants per elevator and destination
+    waiting:        (2 * replications * floors) people waiting per direction (0:up, 1:down), replication and floor
+    arrived:        (replications * floors) people that have arrived on each floor
+    arrivals:       (2 * replications * floors, capacity) ring buffers of the arrival times of the people waiting,
+                    the capacity doubles to hold the longest queue of any replication so memory grows with the queues
+    head:           (2 * replications * floors) position of the first person waiting in the ring buffers
+    calls_up:       (replications) bitset of the levels with people waiting to go up
+    calls_down:     (replications) bitset of the levels with people waiting to go down
+    """
+    def __init__(self, replications, num_floors=10, num_elevators=1, max_load=None, iat=5, seed=123456,
+                 t_move=10, t_open=2, t_close=2, t_enter=2, t_exit=2):
+        if not 2 <= num_floors <= MAX_FLOORS:
+            raise ValueError(f"num_floors must be between 2 and {MAX_FLOORS}")
+        self.replications = replications
+        self.num_floors = num_floors
+        self.num_elevators = num_elevators
+        self.max_load = Elevator.MAX_LOAD if max_load is None else max_load
+        self.iat = iat
+        self.t_move = t_move
+        self.t_open = t_open
+        self.t_close = t_close
+        self.t_enter = t_enter
+        self.t_exit = t_exit
+        self.random = np.random.RandomState(seed)
+
+        cars = num_elevators * replications
+        cells = replications * num_floors
+        self.row = np.tile(np.arange(replications), num_elevators)
+        self.position = np.zeros(cars, dtype=np.int64)
+        self.direction = np.zeros(cars, dtype=np.int64)
+        self.target = np.zeros(cars, dtype=np.int64)
+        self.load = np.zeros(cars, dtype=np.int64)
+        self.phase = np.full(cars, IDLE)
+        self.due = np.full(cars, np.inf)
+        self.is_open = np.zeros(cars, dtype=bool)
+        self.seen = np.zeros(cars, dtype=np.int64)
+        self.car_calls = np.zeros(cars, dtype=np.int64)
+        self.riders = np.zeros(cars * num_floors, dtype=np.int64)
+        self.waiting = np.zeros(2 * cells, dtype=np.int64)
+        self.arrived = np.zeros(cells, dtype=np.int64)
+        self.arrivals = np.zeros((2 * cells, 8))
+        self.head = np.zeros(2 * cells, dtype=np.int64)
+        self.calls_up = np.zeros(replications, dtype=np.int64)
+        self.calls_down = np.zeros(replications, dtype=np.int64)
+
+        self.now = 0.0
+        self.next_arrival = 0.0
+        self.reset_monitors()
+
+    def reset_monitors(self):
+        """Start measuring from now, as Queue.reset_monitors() does for the floors of the simulation"""
+        cells = self.replications * self.num_floors
+        self.start = self.now
+        self.area = np.zeros(cells)  # time integral of the queue lengths
+        self.changed = np.full(cells, self.now)  # last change of the queue lengths
+        self.boarded = np.zeros(cells, dtype=np.int64)
+        self.waits = np.zeros(cells)  # total length of stay of the people boarded
+
+    def touch(self, cells):
+        """
+        Bring the queue length integral of the given floors up to now, called before their queue lengths change.
+        Only the floors that change are touched so the cost of an event does not grow with the number of floors.
+
+        :param cells: replication * num_floors + level of each floor
+        """
+        waiting = self.waiting[cells] + self.waiting[cells + self.arrived.size]
+        self.area[cells] += waiting * (self.now - self.changed[cells])
+        self.changed[cells] = self.now
+
+    def grow(self):
+        """Double the capacity of the arrival time buffers, unrolling the rings so that every head is back at 0"""
+        capacity = self.arrivals.shape[1]
+        order = (self.head[:, None] + np.arange(capacity)) % capacity
+        arrivals = np.zeros((self.arrivals.shape[0], 2 * capacity))
+        arrivals[:, :capacity] = np.take_along_axis(self.arrivals, order, 1)
+        self.arrivals = arrivals
+        self.head[:] = 0
+
+    def moving(self, rows):
+        """
+        Utility function used to find the moving elevators of replications
+        :param rows: replications
+        :return: tuple: (the moving elevators, index of their replication in rows)
+        """
+        cars = (rows + self.replications * np.arange(self.num_elevators)[:, None]).ravel()
+        moving = self.phase[cars] == MOVING
+        return cars[moving], np.tile(np.arange(rows.size), self.num_elevators)[moving]
+
+    def call(self, rows, levels, going_up):
+        """
+        Register hall calls as simulation.call() does. A moving elevator that will pass a new call in its direction
+        before its next event heads for the call instead, as LookStrategy would find it on the way.
+
+        :param rows: replications
+        :param levels:
+        :param going_up: True for a call to go up
+        """
+        bit = np.left_shift(1, levels)
+        np.bitwise_or.at(self.calls_up, rows, bit * going_up)
+        np.bitwise_or.at(self.calls_down, rows, bit * ~going_up)
+
+        cars, index = self.moving(rows)
+        level = levels[index]
+        direction = self.direction[cars]
+        ahead = (self.target[cars] - level) * direction  # levels from the call to the target
+        passing = ((going_up[index] == (direction == 1)) & (ahead > 0)
+                   & (ahead * self.t_move < self.due[cars] - self.now - EPS))
+        cars, ahead, level = cars[passing], ahead[passing], level[passing]
+        nearest = np.argsort(-ahead, kind="mergesort")  # of several new calls in the path, head for the nearest
+        nearest = nearest[first_of(cars[nearest])]
+        cars, ahead = cars[nearest], ahead[nearest]
+        self.target[cars] = level[nearest]
+        self.due[cars] -= ahead * self.t_move
+
+    def answer(self, rows, levels, going_up):
+        """
+        Remove hall calls as simulation.answer() does. A moving elevator heading for one of them, with nobody to let
+        out there, gets its next event on the next level it reaches instead, where LookStrategy may turn around.
+
+        :param rows: replications
+        :param levels:
+        :param going_up: True for a call to go up
+        """
+        bit = np.left_shift(1, levels)
+        np.bitwise_and.at(self.calls_up, rows, ~(bit * going_up))
+        np.bitwise_and.at(self.calls_down, rows, ~(bit * ~going_up))
+
+        cars, index = self.moving(rows)
+        level = levels[index]
+        cars = cars[(self.target[cars] == level) & (self.car_calls[cars] >> level & 1 == 0)]
+        levels = np.maximum(np.ceil((self.due[cars] - self.now) / self.t_move - EPS).astype(np.int64) - 1, 0)
+        self.target[cars] -= levels * self.direction[cars]
+        self.due[cars] -= levels * self.t_move
+
+    def arrive(self):
+        """One new person in every building, start and destination drawn as in Building, waking stationary elevators"""
+        start = self.random.randint(self.num_floors, size=self.replications)
+        dest = self.random.randint(self.num_floors - 1, size=self.replications)
+        dest += dest >= start  # choice of levels excluding the start position
+        going_up = dest > start
+
+        rows = np.arange(self.replications)
+        cells = rows * self.num_floors + start
+        self.touch(cells)
+        key = cells + self.arrived.size * ~going_up
+        count = self.waiting[key]
+        if count.max() == self.arrivals.shape[1]:
+            self.grow()
+        self.arrivals[key, (self.head[key] + count) % self.arrivals.shape[1]] = self.now
+        self.waiting[key] = count + 1
+        self.arrived[cells] += 1
+        self.call(rows, start, going_up)
+
+        self.due[self.phase == IDLE] = self.now  # activate stationary elevators
+
+    def unload(self, cars):
+        """
+        Let out the occupants whose destination is the current position, as Elevator.unload.
+
+        :param cars: elevators that reached a level or were woken up
+        :return: the elevators with nobody to let out
+        """
+        cells = cars * self.num_floors + self.position[cars]
+        exiting = self.riders[cells]
+        out = exiting > 0
+        staying, cars, cells = cars[~out], cars[out], cells[out]
+        self.riders[cells] = 0
+        self.load[cars] -= exiting[out]
+        self.car_calls[cars] &= ~np.left_shift(1, self.position[cars])
+        self.phase[cars] = UNLOADING
+        self.due[cars] = self.now + self.t_open * ~self.is_open[cars] + self.t_exit
+        self.is_open[cars] = True
+        return staying
+
+    def look(self, cars):
+        """
+        One pass of LookStrategy.process after the people have got out: stand by when there are no calls, otherwise
+        pick the direction, answer a hall call in that direction on this level, close the doors or move on.
+
+        :param cars:
+        :return: the elevators that answered a hall call with their doors already open, ready to load
+        """
+        rows = self.row[cars]
+        pos = self.position[cars]
+        bit = np.left_shift(1, pos)
+        above = -(bit << 1)  # levels strictly above
+        below = bit - 1  # levels strictly below
+        hall_up = self.calls_up[rows]
+        hall_down = self.calls_down[rows]
+        calls = self.car_calls[cars] | hall_up | hall_down
+        up_here = (hall_up & bit) != 0
+        down_here = (hall_down & bit) != 0
+
+        # answer a hall call on this level first, otherwise head for the calls
+        d = self.direction[cars]
+        d = np.where(d != 0, d, np.where(up_here | ~down_here & ((calls & above) != 0), 1, -1))
+        going_up = d == 1
+        same_here = np.where(going_up, up_here, down_here)
+        turn = ((calls & np.where(going_up, above, below)) == 0) & ~same_here  # nothing left ahead, turn around
+        d[turn] *= -1
+        going_up ^= turn
+        same_here = np.where(going_up, up_here, down_here)
+
+        idle = calls == 0
+        stop = same_here & ~idle
+        close = ~same_here & ~idle & self.is_open[cars]
+        self.direction[cars] = d * ~idle
+        self.phase[cars[idle]] = IDLE
+        self.due[cars[idle]] = np.inf
+        self.answer(rows[stop], pos[stop], going_up[stop])
+        self.phase[cars[stop]] = OPENING
+        self.due[cars[stop]] = self.now + self.t_open * ~self.is_open[cars[stop]]
+        self.phase[cars[close]] = CLOSING
+        self.due[cars[close]] = self.now + self.t_close
+        self.move(cars[~stop & ~idle & ~close])
+        return cars[stop & self.is_open[cars]]
+
+    def move(self, cars):
+        """
+        Head for the next car call or hall call in the direction of travel, otherwise the last call ahead.
+
+        :param cars: elevators with their doors closed
+        :return: the elevators with nothing ahead
+        """
+        rows = self.row[cars]
+        pos = self.position[cars]
+        bit = np.left_shift(1, pos)
+        going_up = self.direction[cars] == 1
+        mask = np.where(going_up, -(bit << 1), bit - 1)
+        car = self.car_calls[cars]
+        hall_up = self.calls_up[rows]
+        hall_down = self.calls_down[rows]
+        ahead = (car | hall_up | hall_down) & mask
+        stops = (car | np.where(going_up, hall_up, hall_down)) & mask
+        last = np.where(going_up, highest(ahead), lowest(ahead))
+        target = np.where(stops != 0, np.where(going_up, lowest(stops), highest(stops)), last)
+
+        moving = ahead != 0
+        staying, cars, target, pos = cars[~moving], cars[moving], target[moving], pos[moving]
+        self.target[cars] = target
+        self.phase[cars] = MOVING
+        self.due[cars] = self.now + self.t_move * np.abs(target - pos)
+        return staying
+
+    def board(self, cars, opened):
+        """
+        One pass of the loading loop of Elevator.load: t_enter is spent for every person on the floor, whatever their
+        direction, and those going in the elevator's direction get in, first come first served, while there is room.
+        The loop goes on for the people who turned up while it ran and ends when nobody did, leaving a hall call if
+        anyone going in the elevator's direction is left behind.
+
+        :param cars: elevators on different floors
+        :param opened: True where the doors just opened, False where the previous pass ended
+        """
+        rows = self.row[cars]
+        pos = self.position[cars]
+        going_up = self.direction[cars] == 1
+        cells = rows * self.num_floors + pos
+        key = cells + self.arrived.size * ~going_up
+        waiting = self.waiting[key]
+        arrived = self.arrived[cells]
+        iterated = np.where(opened, waiting + self.waiting[cells + self.arrived.size * going_up],
+                            arrived - self.seen[cars])
+
+        done = iterated == 0
+        left = done & (waiting > 0)
+        if left.any():
+            self.call(rows[left], pos[left], going_up[left])
+        self.phase[cars[done]] = CLOSING
+        self.due[cars[done]] = self.now + self.t_close
+
+        go = ~done
+        cars, pos, going_up, cells, key, waiting = cars[go], pos[go], going_up[go], cells[go], key[go], waiting[go]
+        boarding = np.minimum(waiting, self.max_load - self.load[cars])
+        self.touch(cells)
+
+        # length of stay of the people getting on, oldest first
+        capacity = self.arrivals.shape[1]
+        head = self.head[key]
+        person = np.repeat(np.arange(cars.size), boarding)
+        first = np.cumsum(boarding) - boarding
+        slot = (head[person] + np.arange(person.size) - first[person]) % capacity
+        stay = self.now - self.arrivals[key[person], slot]
+        self.waits[cells] += np.bincount(person, weights=stay, minlength=cars.size)
+        self.head[key] = (head + boarding) % capacity
+        self.waiting[key] = waiting - boarding
+        self.boarded[cells] += boarding
+        self.load[cars] += boarding
+
+        # destinations uniform over the levels in the direction of travel, one draw per person getting on
+        p = pos[person]
+        u = self.random.random_sample(person.size)
+        dest = np.where(going_up[person], p + 1 + (u * (self.num_floors - 1 - p)).astype(np.int64),
+                        (u * p).astype(np.int64))
+        np.add.at(self.riders, cars[person] * self.num_floors + dest, 1)
+        np.bitwise_or.at(self.car_calls, cars[person], np.left_shift(1, dest))
+
+        self.phase[cars] = LOADING
+        self.due[cars] = self.now + self.t_enter * iterated[go]
+        self.seen[cars] = arrived[go]
+
+    def step(self, until):
+        """
+        Advance every replication to the next event time, or to until if that comes first.
+        """
+        self.now = min(self.next_arrival, self.due.min(), until)
+        if self.now >= until:
+            return
+
+        if self.now >= self.next_arrival - EPS:
+            self.arrive()
+            self.next_arrival += self.iat
+
+        ready = np.flatnonzero(self.due <= self.now + EPS)
+        phase = self.phase[ready]
+        moved = ready[phase == MOVING]
+        self.position[moved] = self.target[moved]
+        closed = ready[phase == CLOSING]
+        self.is_open[closed] = False
+
+        arrived = self.unload(ready[(phase == MOVING) | (phase == IDLE)])
+        staying = self.move(closed)  # as LookStrategy, move on when there is anywhere to go once the doors are closed
+        opened = self.look(np.concatenate([arrived, staying, ready[phase == UNLOADING]]))
+
+        # elevators on the same floor load one after the other
+        loading = np.concatenate([ready[(phase == OPENING) | (phase == LOADING)], opened])
+        while loading.size:
+            first = first_of(self.row[loading] * self.num_floors + self.position[loading])
+            self.board(loading[first], self.phase[loading[first]] == OPENING)
+            loading = loading[~first]
+
+    def run(self, duration):
+        """
+        Advance every replication by duration.
+
+        :param duration:
+        """
+        until = self.now + duration
+        while self.now < until:
+            self.step(until)
+
+    def results(self):
+        """
+        Per replication and floor statistics of the measured period, the columns of simulation.main()
+
+        :return: dict: people (who got on), length (mean queue length), length_of_stay (mean wait of who got on, nan
+                 where nobody did)
+        """
+        self.touch(np.arange(self.arrived.size))
+        shape = self.replications, self.num_floors
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return dict(people=self.boarded.reshape(shape),
+                        length=(self.area / (self.now - self.start)).reshape(shape),
+                        length_of_stay=(self.waits / self.boarded).reshape(shape))
+
+
+def main(replications=1000, num_floors=10, num_elevators=1, max_load=None, iat=5, seed=123456,
+         warm_up=1000, duration=50000):
+    """
+    Run the replications with the same warm up and run length as simulation.main() and print the per floor mean over
+    the replications with its 95% confidence half width.
+    """
+    engine = LockstepEngine(replications, num_floors=num_floors, num_elevators=num_elevators, max_load=max_load,
+                            iat=iat, seed=seed)
+    engine.run(warm_up)
+    engine.reset_monitors()
+    engine.run(duration)
+    results = engine.results()
+
+    print("floor\tpeople\taverage length\taverage length of stay")
+    for level in range(num_floors):
+        # replications in which nobody got on at a floor have no length of stay for it
+        samples = [results[key][:, level] for key in ("people", "length", "length_of_stay")]
+        columns = [stats.confidence_interval(sample[~np.isnan(sample)].tolist() or [math.nan]) for sample in samples]
+        print(f"{level}\t" + "\t".join(f"{mean:.3f} +/- {half_width:.3f}" for mean, half_width in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate many independent replications of a building at once")
+    parser.add_argument("replications", type=int)
+    parser.add_argument("--num-floors", type=int, default=10)
+    parser.add_argument("--num-elevators", type=int, default=1)
+    parser.add_argument("--max-load", type=int)
+    parser.add_argument("--iat", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=123456)
+    parser.add_argument("--duration", type=float, default=50000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    main(replications=args.replications, num_floors=args.num_floors, num_elevators=args.num_elevators,
+         max_load=args.max_load, iat=args.iat, seed=args.seed, duration=args.duration)
+    print(f"{args.replications} replications in {time.perf_counter() - start:.1f}s")
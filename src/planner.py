@@ -0,0 +1,211 @@
+import argparse
+import itertools
+import math
+import multiprocessing
+
+import simulation
+import stats
+
+
+"""
+Capacity planner built on top of simulation.run().
+
+Answers the question "how many elevators do we need for N floors at this arrival rate to keep the p95 wait under X?".
+The number of elevators is searched by bisection, assuming that adding an elevator never makes the wait worse, for
+every combination of MAX_LOAD and elevator logic asked for. Each configuration is evaluated with independent
+replications (seeds) run in parallel, in rounds that start small and grow, and evaluation stops as soon as the
+confidence interval of the p95 wait lies entirely above the SLA (clearly infeasible) or entirely below it.
+"""
+__author__ = "Thomas McDonnell"
+__title__ = "Elevator Simulation"
+
+
+def replicate(num_floors, num_elevators, max_load, logic, iat, seed, warm_up, duration, percentile):
+    """
+    Run one replication of a configuration, module level so that it can be sent to the worker pool.
+
+    :return: float: the percentile of the wait time on the floor of origin over all floors
+    """
+    floors = simulation.run(num_floors=num_floors, num_elevators=num_elevators, logic=logic, seed=seed,
+                            max_load=max_load, iat=iat, warm_up=warm_up, duration=duration)
+    monitors = [floor.occupants.length_of_stay for floor in floors.values()]
+    waits = monitors[0].merge(*monitors[1:])
+    if waits.number_of_entries() == 0:  # nobody was picked up, as bad as it gets
+        return math.inf
+    return waits.percentile(percentile)
+
+
+class Configuration:
+    """
+    A class used to represent an evaluated configuration
+
+    Attributes
+    ----------
+    num_elevators:  number of elevators
+    max_load:       maximum occupancy of each elevator
+    logic:          index into Elevator.LOGIC
+    samples:        the wait percentile of each replication run
+    mean:           mean of the samples
+    half_width:     95% confidence half width of the mean
+    feasible:       True if the upper confidence bound meets the SLA
+    """
+    def __init__(self, num_elevators, max_load, logic, samples, sla):
+        self.num_elevators = num_elevators
+        self.max_load = max_load
+        self.logic = logic
+        self.samples = samples
+        self.mean, self.half_width = stats.confidence_interval(samples)
+        self.feasible = self.upper <= sla
+
+    @property
+    def lower(self):
+        return self.mean - self.half_width
+
+    @property
+    def upper(self):
+        return self.mean + self.half_width
+
+    def cost(self):
+        """Cars are the expensive part, then the size of each car"""
+        return self.num_elevators, self.max_load
+
+    def __repr__(self):
+        return (f"Configuration(num_elevators={self.num_elevators}, max_load={self.max_load}, "
+                f"logic={simulation.Elevator.LOGIC[self.logic].name}, mean={self.mean:.3f}, "
+                f"ci=[{self.lower:.3f}, {self.upper:.3f}], replications={len(self.samples)})")
+
+
+class CapacityPlanner:
+    """
+    A class used to search for the cheapest configuration meeting a wait time SLA
+
+    Attributes
+    ----------
+    num_floors:     number of floors in the building
+    sla:            the wait time the percentile must stay under
+    percentile:     percentile of the wait time checked against the sla default=95
+    iat:            inter arrival time of people in the building default=5
+    max_elevators:  upper bound of the search default=num_floors
+    max_loads:      elevator occupancies to try default=(Elevator.MAX_LOAD,)
+    logics:         indexes into Elevator.LOGIC to try default=(0,)
+    replications:   maximum number of replications per configuration default=10
+    first_round:    replications in the first round of an evaluation, each later round doubles default=3
+    processes:      size of the worker pool, caps the size of a round default=cpu count
+    evaluated:      cache of evaluated configurations { key=tuple: (num_elevators, max_load, logic): Configuration }
+    """
+    def __init__(self, num_floors, sla, percentile=95, iat=5, max_elevators=None, max_loads=None, logics=(0,),
+                 replications=10, first_round=3, processes=None, seed=123456, warm_up=1000, duration=50000):
+        if replications < 1:
+            raise ValueError("replications must be at least 1")
+        if first_round < 1:
+            raise ValueError("first_round must be at least 1")
+        self.num_floors = num_floors
+        self.sla = sla
+        self.percentile = percentile
+        self.iat = iat
+        self.max_elevators = max_elevators or num_floors
+        self.max_loads = max_loads or (simulation.Elevator.MAX_LOAD,)
+        self.logics = logics
+        self.replications = replications
+        self.first_round = first_round
+        self.processes = processes or multiprocessing.cpu_count()
+        self.seed = seed
+        self.warm_up = warm_up
+        self.duration = duration
+        self.evaluated = {}
+        self.pool = None
+
+    def evaluate(self, num_elevators, max_load, logic):
+        """
+        Run replications of a configuration in rounds, a small first round and then doubling up to one replication per
+        worker. After each round the configuration is settled, and no more replications are run, if the confidence
+        interval no longer contains the SLA. A clearly infeasible configuration is pruned after the first round, as is
+        one where nobody was picked up in some replication.
+
+        :return: Configuration
+        """
+        key = num_elevators, max_load, logic
+        if key in self.evaluated:
+            return self.evaluated[key]
+
+        samples = []
+        seeds = (self.seed + i for i in range(self.replications))  # common random numbers across configurations
+        size = self.first_round
+        while len(samples) < self.replications:
+            batch = [(self.num_floors, num_elevators, max_load, logic, self.iat, seed, self.warm_up,
+                      self.duration, self.percentile)
+                     for seed in itertools.islice(seeds, size)]
+            samples.extend(self.pool.starmap(replicate, batch))
+            size = max(min(size * 2, self.processes), 1)
+            config = Configuration(num_elevators, max_load, logic, samples, self.sla)
+            if math.isinf(config.mean) or config.lower > self.sla or config.upper <= self.sla:
+                break
+
+        self.evaluated[key] = config
+        return config
+
+    def bisect(self, max_load, logic, hi):
+        """
+        Find the fewest elevators in [1, hi] meeting the SLA for a given occupancy and logic.
+
+        :return: Configuration or None if even hi elevators are infeasible
+        """
+        best = self.evaluate(hi, max_load, logic)
+        if not best.feasible:
+            return None
+
+        lo = 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            config = self.evaluate(mid, max_load, logic)
+            if config.feasible:
+                best, hi = config, mid
+            else:
+                lo = mid + 1
+        return best
+
+    def plan(self):
+        """
+        Search every occupancy and logic combination, cheapest occupancies first. A combination can at best tie the
+        cheapest configuration found so far on the number of elevators, so the upper bound of the search shrinks as
+        the search goes on.
+
+        :return: Configuration or None if nothing within max_elevators meets the SLA
+        """
+        cheapest = None
+        pool = multiprocessing.Pool(self.processes)
+        self.pool = pool
+        try:
+            for max_load, logic in itertools.product(sorted(self.max_loads), self.logics):
+                hi = self.max_elevators if cheapest is None else cheapest.num_elevators
+                config = self.bisect(max_load, logic, hi)
+                if config is not None and (cheapest is None or config.cost() < cheapest.cost()):
+                    cheapest = config
+        finally:
+            self.pool = None
+            pool.terminate()
+        return cheapest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the fewest elevators that keep the wait under an SLA")
+    parser.add_argument("num_floors", type=int)
+    parser.add_argument("sla", type=float, help="wait time the percentile must stay under")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--iat", type=float, default=5, help="inter arrival time of people")
+    parser.add_argument("--max-elevators", type=int)
+    parser.add_argument("--max-loads", type=int, nargs="+")
+    parser.add_argument("--logics", type=int, nargs="+", default=[0])
+    parser.add_argument("--replications", type=int, default=10)
+    parser.add_argument("--first-round", type=int, default=3, help="replications before the first pruning check")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--seed", type=int, default=123456)
+    parser.add_argument("--warm-up", type=float, default=1000)
+    parser.add_argument("--duration", type=float, default=50000)
+    args = parser.parse_args()
+
+    planner = CapacityPlanner(num_floors=args.num_floors, sla=args.sla, percentile=args.percentile, iat=args.iat,
+                              max_elevators=args.max_elevators, max_loads=args.max_loads, logics=args.logics,
+                              replications=args.replications, first_round=args.first_round,
+                              processes=args.processes, seed=args.seed, warm_up=args.warm_up, duration=args.duration)
+    print(planner.plan())
@@ -1,7 +1,10 @@
 import salabim as sim
 import itertools
+import math
 import sys
 
+import stats
+
 
 """
 This is an elevator simulation which leverages the Salabim Python Package, developed with a similar take on 
@@ -30,18 +33,48 @@ __title__ = "Elevator Simulation"
 
 # globals
 requests = None
+hall_calls = None
 floors = None
 elevators = None
 
 
+def call(floor, direction, now):
+    """
+    Register a hall call for a floor and direction of travel, keeping the requests and hall call bitsets in step.
+
+    :param floor:
+    :param direction:
+    :param now: request time
+    """
+    if not (floor, direction) in requests:
+        requests[floor, direction] = now
+        hall_calls[direction] |= 1 << floor.level_n
+        for elevator in elevators:
+            elevator.strategy.called(elevator, floor, direction)
+
+
+def answer(floor, direction):
+    """
+    Remove the hall call for a floor and direction of travel.
+
+    :param floor:
+    :param direction:
+    """
+    del requests[floor, direction]
+    hall_calls[direction] &= ~(1 << floor.level_n)
+    for elevator in elevators:
+        elevator.strategy.answered(elevator, floor, direction)
+
+
 class Building(sim.Component):
     """
     Factory class for generating people in a building with random selection of start position
-    and destination
+    and destination, one person every iat time units
     """
-    def __init__(self, num_floors, *args, **kwargs):
+    def __init__(self, num_floors, iat=5, *args, **kwargs):
         sim.Component.__init__(self, *args, **kwargs)
         self.num_floors = num_floors
+        self.iat = iat  # inter arrival time between people
         self.choice = [x for x in range(self.num_floors)]
 
     def process(self):
@@ -51,7 +84,7 @@ class Building(sim.Component):
             dest = sim.random.choice(dest_choice)  # randomly select the destination level
 
             Person(start=start, dest=dest)  # init an instance of Person
-            yield self.hold(5)  # yield control
+            yield self.hold(self.iat)  # yield control
 
 
 class Person(sim.Component):
@@ -68,6 +101,7 @@ class Person(sim.Component):
 
     requests:       global -> to both People and Elevator dictionary obj ->
                     { key=tuple: (floor obj, direction): val=int: request time }
+    hall_calls:     global -> the requests as bitsets { key=int: direction: val=int: bit n set for level n }
     levels:         global -> to both People and Elevator [floor obj.... n]
     """
     new_id = itertools.count()
@@ -106,14 +140,13 @@ class Person(sim.Component):
         # priority logic for elevator
         # requests will store { (floor, direction): time }
         # elevator will work of a priority schedule
-        if not (self.start, self.direction) in requests:
-            requests[self.start, self.direction] = self.env.now()
+        call(self.start, self.direction, self.env.now())
 
         for elevator in elevators:
             if elevator.ispassive():  # if the elevator is stationary
                 elevator.activate()  # activate the elevator
 
-            yield self.passivate()  # wait for the elevator
+        yield self.passivate()  # wait for the elevator
 
 
 class Floor:
@@ -143,6 +176,204 @@ class Floor:
         return people
 
 
+class Strategy:
+    """
+    Base class of the elevator strategies, a strategy drives an elevator through its process generator.
+    Due to the call sequence of salabim setup and process methods it is not possible to subclass the elevator per
+    strategy, so the elevator delegates its process to a strategy instead.
+
+    The default loop lets people out, then takes in people going in the current direction or failing that the
+    opposite direction, and moves one level at a time. Subclasses fine tune it through idle() and move().
+
+    Attributes
+    ----------
+    name:   name the strategy is registered under in Elevator.LOGIC
+    """
+    name = None
+
+    def process(self, elevator):
+        while True:
+            # if the elevator is stationary and has not been requested
+            if elevator.direction == 0 and not requests:
+                # simulate passive state (yield control)
+                yield elevator.passivate(mode=f"Stationary @ {elevator.position.level_n}")
+
+            yield from elevator.unload()
+
+            if elevator.direction == 0:
+                elevator.direction = 1  # reset direction arbitrarily up or down
+
+            for elevator.direction in (elevator.direction, -elevator.direction):  # for both directions
+                yield from elevator.load()
+                if elevator.occupants:
+                    break
+            else:
+                self.idle(elevator)
+
+            yield from elevator.close()
+
+            if elevator.direction != 0:  # are we in a moving state
+                yield from self.move(elevator)
+
+    def idle(self, elevator):
+        """
+        Called when nobody got on in either direction
+        :param elevator:
+        """
+
+    def called(self, elevator, floor, direction):
+        """
+        Called for every elevator when a new hall call is registered
+        :param elevator:
+        :param floor:
+        :param direction:
+        """
+
+    def answered(self, elevator, floor, direction):
+        """
+        Called for every elevator when a hall call is answered
+        :param elevator:
+        :param floor:
+        :param direction:
+        """
+
+    def move(self, elevator):
+        """
+        Move one level up or down depending on the direction
+        :param elevator:
+        """
+        yield from elevator.move_to(floors[elevator.position.level_n + elevator.direction])
+
+
+class StandardStrategy(Strategy):
+    """
+    The elevator sweeps the building from bottom to top and back regardless of the requests.
+    """
+    name = "standard"
+
+    def move(self, elevator):
+        # here we are no longer working with priority of requests and so may run off the building,
+        # turn around at the top and bottom floors instead
+        if elevator.position.level_n + elevator.direction not in floors:
+            elevator.direction = -elevator.direction
+        yield from super().move(elevator)
+
+
+class PriorityStrategy(Strategy):
+    """
+    When nobody got on the elevator heads for the oldest request, or stops if there are none.
+    """
+    name = "priority"
+
+    def idle(self, elevator):
+        if requests:
+            first_req = sim.inf  # is essentially the same as scheduling for time=inf
+            for (position, direction) in requests:
+                if requests[position, direction] < first_req:  # check priority of the request
+                    elevator.direction = Elevator.find_direction(elevator.position, position)  # adjust the direction
+                    first_req = requests[position, direction]  # set the target request
+        else:
+            elevator.direction = 0  # if no requests elevator is stationary
+
+
+class LookStrategy(Strategy):
+    """
+    LOOK or collective control. The elevator keeps going in its direction while there are car calls or hall calls
+    ahead, stopping on the way for car calls and hall calls in its direction of travel, and turns around when there is
+    nothing left ahead. Calls are kept as bitsets, bit n set for level n, so the next stop ahead is found with bit
+    operations rather than by walking the floors and the elevator moves there in one hold. A call made in its path
+    while it is travelling, or the answer of the call it is heading for, cuts the hold short so that the elevator
+    stops where it would have going one level at a time.
+    """
+    name = "look"
+
+    @staticmethod
+    def ahead(calls, level, direction):
+        """
+        Utility function used to mask out the calls that are not strictly ahead of a level
+        :param calls:
+        :param level:
+        :param direction:
+        :return: int: bitset of calls ahead
+        """
+        if direction == 1:
+            return calls >> (level + 1) << (level + 1)
+        return calls & ((1 << level) - 1)
+
+    @staticmethod
+    def nearest(calls, direction):
+        """
+        Utility function used to find the first call reached when travelling in a direction
+        :param calls: bitset of calls ahead, not empty
+        :param direction:
+        :return: int: level
+        """
+        if direction == 1:
+            return (calls & -calls).bit_length() - 1  # lowest set bit
+        return calls.bit_length() - 1  # highest set bit
+
+    def process(self, elevator):
+        while True:
+            yield from elevator.unload()
+
+            if not (elevator.car_calls or requests):
+                elevator.direction = 0
+                # simulate passive state (yield control)
+                yield elevator.passivate(mode=f"Stationary @ {elevator.position.level_n}")
+                continue
+
+            level = elevator.position.level_n
+            calls = elevator.car_calls | hall_calls[1] | hall_calls[-1]
+            if elevator.direction == 0:
+                # answer a hall call on this level first, otherwise head for the calls
+                if hall_calls[1] >> level & 1 or hall_calls[-1] >> level & 1:
+                    elevator.direction = 1 if hall_calls[1] >> level & 1 else -1
+                else:
+                    elevator.direction = 1 if LookStrategy.ahead(calls, level, 1) else -1
+
+            if not (LookStrategy.ahead(calls, level, elevator.direction)
+                    or hall_calls[elevator.direction] >> level & 1):
+                elevator.direction = -elevator.direction  # nothing left ahead, turn around
+
+            yield from elevator.load()
+            yield from elevator.close()
+
+            direction = elevator.direction
+            ahead = LookStrategy.ahead(elevator.car_calls | hall_calls[1] | hall_calls[-1], level, direction)
+            if ahead:
+                # head for the next car call or hall call in the direction of travel, otherwise the last call
+                stops = LookStrategy.ahead(elevator.car_calls | hall_calls[direction], level, direction)
+                if stops:
+                    target = LookStrategy.nearest(stops, direction)
+                else:
+                    target = LookStrategy.nearest(ahead, -direction)
+                yield from elevator.move_to(floors[target], mode=f"Moving to {target}")
+
+    def called(self, elevator, floor, direction):
+        # a new call in the direction of travel that the elevator will pass before its destination becomes the
+        # destination, the elevator reaches it t_move earlier per level it is short of the destination
+        if elevator.destination is None or direction != elevator.direction:
+            return
+        levels = (elevator.destination.level_n - floor.level_n) * direction
+        remaining = elevator.scheduled_time() - elevator.env.now()
+        if 0 < levels and levels * elevator.t_move < remaining:
+            elevator.destination = floor
+            elevator.activate(at=elevator.scheduled_time() - levels * elevator.t_move,
+                              mode=f"Moving to {floor.level_n}")
+
+    def answered(self, elevator, floor, direction):
+        # the call the elevator was heading for is gone, with nobody to let out there stop on the next level instead
+        # where there may be nothing left ahead
+        if elevator.destination is not floor or elevator.car_calls >> floor.level_n & 1:
+            return
+        remaining = elevator.scheduled_time() - elevator.env.now()
+        levels = math.ceil(remaining / elevator.t_move) - 1  # levels between the next level and the destination
+        if levels > 0:
+            elevator.destination = floors[floor.level_n - levels * elevator.direction]
+            elevator.activate(at=elevator.scheduled_time() - levels * elevator.t_move,
+                              mode=f"Moving to {elevator.destination.level_n}")
+
+
 class Elevator(sim.Component):
     """
     A class used to represent an Elevator inherits from salabim built in component
@@ -152,6 +383,7 @@ class Elevator(sim.Component):
     Attributes
     ----------
     MAX_LOAD:       static int maximum occupancy
+    max_load:       maximum occupancy of this elevator default=MAX_LOAD
     position:       floor currently being serviced
     direction:      integer value denominates direction 1:up, -1:down, 0:still default=0:still
     t_move:         time taken for elevator to move one level default=10
@@ -160,21 +392,26 @@ class Elevator(sim.Component):
     t_enter         time allocated for occupants to enter default=5
     t_exit          time allocated for occupants to exit default=5
     occupants:      sim component queue of people currently occupying available slots
+    car_calls:      bitset of the destinations of the occupants, bit n set for level n
+    destination:    floor the elevator is moving to, None when it is not moving
+    strategy:       Strategy obj driving the elevator, see LOGIC
     occ_for_level:  number of occupants for a given level
 
     requests:       global -> to both People and Elevator
     levels:         global -> to both People and Elevator
     """
     MAX_LOAD: int = 8  # maximum slots allocated for people which people may take up
-    LOGIC = ["standard", "priority"]
+    LOGIC = [StandardStrategy, PriorityStrategy, LookStrategy]  # strategies selectable by index
 
     def __init__(self, system, position=0, direction=0, t_move=10, t_open=2, t_close=2,
-                 t_enter=2, t_exit=2, *args, **kwargs):
+                 t_enter=2, t_exit=2, max_load=None, *args, **kwargs):
         sim.Component.__init__(self, *args, **kwargs)
         self.position = floors[position]  # starting position (level) of the elevator
-        self.max_load = Elevator.MAX_LOAD
+        self.max_load = Elevator.MAX_LOAD if max_load is None else max_load
         self.occupants = sim.Queue(name=f"occupants in lift")
-        self.system = Elevator.LOGIC[system]
+        self.strategy = Elevator.LOGIC[system]()
+        self.car_calls = 0
+        self.destination = None
         # simulation constants defaults given
         self.direction = direction
         self.t_move = t_move
@@ -228,167 +465,283 @@ class Elevator(sim.Component):
         else:
             return 0
 
+    def call_for(self, person):
+        """
+        Utility function used to register a car call once a person is on board
+        :param person:
+        """
+        self.car_calls |= 1 << person.dest.level_n
+
+    def unload(self):
+        """
+        Let out the occupants whose destination is the current position, opening the doors if needed.
+        """
+        if Elevator.occ_for_level(self.occupants, self.position) > 0:
+            # simulate opening the door
+            yield self.hold(self.t_open, mode=f"Doors opening @ {self.position.level_n}")
+            self.is_open = True
+
+            # occupants exit at their floor
+            for person in self.occupants:
+                if person.dest == self.position:
+                    person.leave(self.occupants)
+                    person.activate()  # the occupant object state is terminated
+            self.car_calls &= ~(1 << self.position.level_n)  # car call answered
+            # simulate the exit time
+            yield self.hold(self.t_exit, mode=f"People exiting @ {self.position.level_n}")
+
+    def load(self):
+        """
+        Answer the request for the current position and direction if there is one, letting in as many people
+        travelling in that direction as there is room for. People left behind request the elevator again.
+        """
+        if (self.position, self.direction) in requests:
+            answer(self.position, self.direction)  # delete if found in requests
+
+            if not self.is_open:  # if the door is closed simulate opening and set current state
+                yield self.hold(self.t_open, mode=f"Doors opening {self.position.level_n}")
+                self.is_open = True
+
+            for person in self.position.occupants:
+                if person.direction == self.direction and Elevator.has_room(self.occupants, self.max_load):
+                    person.leave(self.position.occupants)
+                    person.enter(self.occupants)
+                    self.call_for(person)
+                yield self.hold(self.t_enter, mode=f"Letting people in @ {self.position.level_n}")
+
+            if self.position.occ_for_direction(self.direction) > 0:
+                call(self.position, self.direction, self.env.now())
+
+    def close(self):
+        """
+        If the elevator doors are open then simulate them closing
+        """
+        if self.is_open:
+            yield self.hold(self.t_close, mode=f"Door closing @ {self.position.level_n}")
+            self.is_open = False  # set state change
+
+    def move_to(self, destination, mode="Moving"):
+        """
+        Simulate the move from the current position to the destination
+        :param destination:
+        :param mode: salabim mode shown in the trace
+        """
+        self.destination = destination
+        yield self.hold(self.t_move * abs(destination.level_n - self.position.level_n), mode=mode)
+        self.position = self.destination  # set the current position, the strategy may have changed the destination
+        self.destination = None
+
     def process(self):
         """
         The process function is called after initiation, much in the same way any java main run method would be called.
-        This is not a very elegant way of switching between two different elevator strategies, however due to the call
-        sequence of salabim setup and process methods it is not possible to use multiple inheritance in the form of a
-        base class sim.Component. I had toyed with the idea of using a delegate design pattern but in truth this seems
-        over kill and added complexity that would not read well.
-        """
-        if self.system == Elevator.LOGIC[0]:
-            while True:
-                if self.direction == 0:
-                    if not requests:
-                        # simulate passive state
-                        yield self.passivate(mode=f"Stationary @ {self.position.level_n}")
-                # if we have people for the current level
-                if Elevator.occ_for_level(self.occupants, self.position) > 0:
-                    yield self.hold(self.t_open, mode=f"Doors opening @ {self.position.level_n}")
-
-                    for person in self.occupants:
-                        if person.dest == self.position:
-                            person.leave(self.occupants)
-                            person.activate()
-                    yield self.hold(self.t_exit, mode=f"People exiting @ {self.position.level_n}")
-
-                if self.direction == 0:
-                    self.direction = 1
-
-                for self.direction in (self.direction, -self.direction):  # for both directions
-                    # check the requests for the current position and directions
-                    if (self.position, self.direction) in requests:
-                        del requests[self.position, self.direction]  # delete if found in requests
-
-                        if not self.is_open:  # if the door is closed simulate opening and set current state
-                            yield self.hold(self.t_open, mode=f"Doors opening {self.position.level_n}")
-                            self.is_open = True
-
-                        for person in self.position.occupants:
-                            if person.direction == self.direction and Elevator.has_room(self.occupants, self.max_load):
-                                # import pdb; pdb.set_trace()
-                                person.leave(self.position.occupants)
-                                person.enter(self.occupants)
-                            yield self.hold(self.t_enter, mode=f"Letting people in @ {self.position.level_n}")
-
-                        if self.position.occ_for_direction(self.direction) > 0:
-                            if not (self.position, self.direction) in requests:
-                                requests[self.position, self.direction] = self.env.now()
-
-                    if self.occupants:
-                        break
-
-                if self.is_open:
-                    # if the elevator doors are open then simulate them closing
-                    yield self.hold(self.t_close, mode=f"Door closing @ {self.position.level_n}")
-                    self.is_open = False  # set state change
-                # import pdb; pdb.set_trace()
-
-                if self.direction != 0:  # are we in a moving state
-                    # here we are no longer working with priority of requests and so may try to index a floor that does
-                    # not exist. Catch the error (KeyError) and invert the direction with abs()
-                    try:
-                        _next = floors[self.position.level_n + self.direction]  # move up or down depending
-                        yield self.hold(self.t_move, mode="Moving")  # simulate the move
-                        self.position = _next  # set the current position
-                    except KeyError:
-                        self.direction == abs(self.direction)
+        The elevator is driven by its strategy, salabim only sees the one process generator.
+        """
+        yield from self.strategy.process(self)
 
-        else:
-            while True:
-                # import pdb; pdb.set_trace()
-                # if the elevator is stationary and has not been requested
-                if self.direction == 0:
-                    if not requests:
-                        # simulate passive state (yield control)
-                        yield self.passivate(mode=f"Stationary @ {self.position.level_n}")
-
-                # if we currently have people for this floor
-                if Elevator.occ_for_level(self.occupants, self.position) > 0:
-                    # simulate opening the door
-                    yield self.hold(self.t_open, mode=f"Doors opening @ {self.position.level_n}")
-                    self.is_open = True
-
-                    # occupants exit at their floor
-                    for person in self.occupants:
-                        if person.dest == self.position:
-                            person.leave(self.occupants)
-                            person.activate()  # the occupant object state is terminated
-                            # {mode="") -> to be used in trace
-                        # simulate the exit time
-                    yield self.hold(self.t_exit, mode=f"People exiting @ {self.position.level_n}")
-
-                if self.direction == 0:
-                    self.direction = 1  # reset direction arbitrarily up or down
-
-                for self.direction in (self.direction, -self.direction):  # for both directions
-                    # check the requests for the current position and directions
-                    if (self.position, self.direction) in requests:
-                        del requests[self.position, self.direction]  # delete if found in requests
-
-                        if not self.is_open:  # if the door is closed simulate opening and set current state
-                            yield self.hold(self.t_open, mode=f"Doors opening {self.position.level_n}")
-                            self.is_open = True
-
-                        for person in self.position.occupants:
-                            if person.direction == self.direction and Elevator.has_room(self.occupants, self.max_load):
-                                # import pdb; pdb.set_trace()
-                                person.leave(self.position.occupants)
-                                person.enter(self.occupants)
-                            yield self.hold(self.t_enter, mode=f"Letting people in @ {self.position.level_n}")
-
-                        if self.position.occ_for_direction(self.direction) > 0:
-                            if not (self.position, self.direction) in requests:
-                                requests[self.position, self.direction] = self.env.now()
-
-                    if self.occupants:
-                        break
-                else:
-                    if requests:
-                        first_req = sim.inf  # is essentially the same as scheduling for time=inf
-                        for (position, direction) in requests:
-                            if requests[position, direction] < first_req:  # check priority of the request
-                                self.direction = Elevator.find_direction(self.position, position)  # adjust the direction
-                                first_req = requests[position, direction]  # set the target request
-                    else:
-                        self.direction = 0  # if no requests elevator is stationary
-
-                if self.is_open:
-                    # if the elevator doors are open then simulate them closing
-                    yield self.hold(self.t_close, mode=f"Door closing @ {self.position.level_n}")
-                    self.is_open = False  # set state change
-
-                if self.direction != 0:  # are we in a moving state
-                    _next = floors[self.position.level_n + self.direction]  # move up or down depending
-                    yield self.hold(self.t_move, mode="Moving")  # simulate the move
-                    self.position = _next  # set the current position
-
-
-def main(num_floors=10, num_elevators=1, logic=0, seed=123456):
+
+class QueueSampler(sim.Component):
+    """
+    Samples the number of people waiting on each floor at a fixed interval
+
+    Attributes
+    ----------
+    interval:   time between samples
+    series:     { key=int: level: val=list: queue length samples }
+    """
+    def __init__(self, interval, *args, **kwargs):
+        sim.Component.__init__(self, *args, **kwargs)
+        self.interval = interval
+        self.series = {level: [] for level in floors}
+
+    def process(self):
+        while True:
+            for level, floor in floors.items():
+                self.series[level].append(len(floor.occupants))
+            yield self.hold(self.interval)
+
+
+class RunLengthControl:
+    """
+    A class used to size the warm up period and the measured run instead of using fixed lengths
+
+    The end of the initial transient is found with MSER-5 on the queue length series of every floor, taking the latest
+    truncation point over the floors. The pilot run is doubled, up to max_warm_up, until every floor's truncation point
+    falls in the first half of its series. The floor monitors are not reset, the measured run starts at the truncation
+    point so the pilot after it is kept, and the results are read through slice(). The measured run is extended one
+    batch at a time until the batch means estimate of the mean wait is within the precision, relative to the mean, at
+    95% confidence. Batch means that are correlated at lag 1 are not independent enough for the interval, the batch
+    is then doubled and the batch means recomputed. If MSER-5 never settles or max_duration is reached first the run
+    is flagged through settled and converged rather than failing.
+
+    Attributes
+    ----------
+    precision:          relative confidence half width of the mean wait to reach default=0.05
+    interval:           time between queue length samples default=5
+    pilot:              length of the first pilot run default=500
+    batch:              length of a batch of the measured run, doubled while batch means are correlated default=1000
+    min_batches:        batches run before the precision is checked default=10
+    max_correlation:    largest lag 1 autocorrelation of the batch means taken as independent default=0.2
+    max_warm_up:        longest pilot run default=20000
+    max_duration:       longest measured run default=50000
+    warm_up:            start of the measured run, the detected end of the transient
+    duration:           length of the measured run
+    batch_means:        mean wait of every batch anyone boarded in
+    mean:               batch means estimate of the mean wait, nan without batch means
+    half_width:         95% confidence half width of the mean wait, inf with fewer than two batch means
+    settled:            MSER-5 found the end of the transient on every floor, if not warm_up is the whole pilot
+    converged:          the precision was reached within max_duration
+    """
+    def __init__(self, precision=0.05, interval=5, pilot=500, batch=1000, min_batches=10, max_correlation=0.2,
+                 max_warm_up=20000, max_duration=50000):
+        self.precision = precision
+        self.interval = interval
+        self.pilot = pilot
+        self.batch = batch
+        self.min_batches = min_batches
+        self.max_correlation = max_correlation
+        self.max_warm_up = max_warm_up
+        self.max_duration = max_duration
+        self.warm_up = None
+        self.duration = None
+        self.batch_means = []
+        self.mean = math.nan
+        self.half_width = math.inf
+        self.settled = False
+        self.converged = False
+
+    def run_warm_up(self, env):
+        """
+        Run pilots until MSER-5 finds the end of the transient on every floor.
+
+        :param env:
+        """
+        sampler = QueueSampler(interval=self.interval)
+        env.run(min(self.pilot, self.max_warm_up))
+        truncations = [stats.mser5(series) for series in sampler.series.values()]
+        while None in truncations and env.now() < self.max_warm_up:
+            env.run(min(env.now(), self.max_warm_up - env.now()))  # double the pilot
+            truncations = [stats.mser5(series) for series in sampler.series.values()]
+        sampler.cancel()
+
+        self.settled = None not in truncations
+        if self.settled:
+            self.warm_up = max(truncations) * self.interval
+        else:  # the whole pilot is transient
+            self.warm_up = env.now()
+
+    def slice(self, monitor):
+        """
+        The part of a monitor recorded during the measured run
+
+        :param monitor:
+        :return: sliced monitor
+        """
+        return monitor.slice(start=self.warm_up)
+
+    def run_measurement(self, env):
+        """
+        Run batches until the batch means estimate of the mean wait reaches the precision, doubling the batch while
+        the batch means are correlated.
+
+        :param env:
+        """
+        batches = 0
+        while True:
+            # batch means of the batches completed so far, part of the first ones may come from the pilot
+            while self.warm_up + (batches + 1) * self.batch <= env.now():
+                start = self.warm_up + batches * self.batch
+                monitors = [floor.occupants.length_of_stay.slice(start=start, stop=start + self.batch)
+                            for floor in floors.values()]
+                waits = monitors[0].merge(*monitors[1:])
+                if waits.number_of_entries():
+                    self.batch_means.append(waits.mean())
+                batches += 1
+
+            if self.batch_means:
+                self.mean, self.half_width = stats.confidence_interval(self.batch_means)
+            if len(self.batch_means) >= self.min_batches:
+                if stats.lag1_autocorrelation(self.batch_means) > self.max_correlation:
+                    self.batch *= 2
+                    self.batch_means = []
+                    batches = 0
+                    continue
+                if self.half_width <= self.precision * self.mean:
+                    self.converged = True
+                    break
+            if env.now() - self.warm_up >= self.max_duration:
+                break
+            env.run(self.warm_up + (batches + 1) * self.batch - env.now())
+        self.duration = env.now() - self.warm_up
+
+
+def run(num_floors=10, num_elevators=1, logic=0, seed=123456, max_load=None, iat=5,
+        warm_up=1000, duration=50000, trace=False, control=None):
+    """
+    Build a fresh environment and run the simulation, the floor monitors are reset after the warm up period so that
+    only the measured run is reported. If a RunLengthControl is given it sizes the warm up period and the measured run
+    instead of warm_up and duration, the floor monitors are then not reset and control.slice() gives the measured run.
+
+    :param num_floors:
+    :param num_elevators:
+    :param logic: index into Elevator.LOGIC
+    :param seed:
+    :param max_load: occupancy of each elevator, defaults to Elevator.MAX_LOAD
+    :param iat: inter arrival time of people in the building
+    :param warm_up: length of the warm up period
+    :param duration: length of the measured run
+    :param trace: trace the warm up period
+    :param control: RunLengthControl obj
+    :return: dict: { key=int: level: val=Floor obj }
+    """
     env = sim.Environment(random_seed=seed)
 
-    Building(num_floors=num_floors)
-    global floors, elevators, requests
+    Building(num_floors=num_floors, iat=iat)
+    global floors, elevators, requests, hall_calls
     floors = {i: Floor(i) for i in range(num_floors)}
-    elevators = [Elevator(system=logic) for _ in range(num_elevators)]
+    elevators = [Elevator(system=logic, max_load=max_load) for _ in range(num_elevators)]
     requests = {}
+    hall_calls = {1: 0, -1: 0}
 
-    env.trace(True)
-    env.run(1000)
+    if control is not None:
+        env.trace(trace)
+        control.run_warm_up(env)
+        env.trace(False)
+        control.run_measurement(env)
+        return floors
+
+    env.trace(trace)
+    env.run(warm_up)
     env.trace(False)
     for floor in floors.values():
         floor.occupants.reset_monitors()
-    env.run(50000)
+    env.run(duration)
+    return floors
+
+
+def main(num_floors=10, num_elevators=1, logic=0, seed=123456, precision=None):
+    """
+    Run the simulation and write the per floor results, with a precision the run lengths are sized automatically.
+    """
+    control = RunLengthControl(precision=precision) if precision else None
+    run(num_floors=num_floors, num_elevators=num_elevators, logic=logic, seed=seed, trace=True, control=control)
 
     with open("db.txt", "w") as f:
         with open('trace.txt', "w") as f_t:
             f_t.write("floor\tpeople\taverage length of stay\n")
             for floor in floors.values():
-                f.write(f"{floor.level_n},{floor.occupants.length_of_stay.mean()}\r\n")
+                length, length_of_stay = floor.occupants.length, floor.occupants.length_of_stay
+                if control is not None:
+                    length, length_of_stay = control.slice(length), control.slice(length_of_stay)
+                f.write(f"{floor.level_n},{length_of_stay.mean()}\r\n")
                 f_t.write(f"{floor.level_n}\t"
-                          f"{floor.occupants.length_of_stay.number_of_entries()}"
-                          f"{floor.occupants.length.mean():15.3f}"
-                          f"{floor.occupants.length_of_stay.mean():15.3f}\r\n")
+                          f"{length_of_stay.number_of_entries()}"
+                          f"{length.mean():15.3f}"
+                          f"{length_of_stay.mean():15.3f}\r\n")
+            if control is not None:
+                # the interval is nan/inf if too few batches had anyone boarding
+                f_t.write(f"warm up {control.warm_up:.0f}\tmeasured {control.duration:.0f}\t"
+                          f"batch {control.batch}\tmean wait {control.mean:.3f} +/- {control.half_width:.3f}\r\n")
+                f_t.write(f"settled {control.settled}\tconverged {control.converged}\r\n")
 
 
 if __name__ == "__main__":
@@ -398,7 +751,10 @@ if __name__ == "__main__":
     ever be run by the controller, error checking from the view will ensure that this script is never run outside of the 
     params defined below. 
     """
-    if len(sys.argv) == 5:
+    if len(sys.argv) == 6:
+        main(num_floors=int(sys.argv[1]), num_elevators=int(sys.argv[2]), logic=int(sys.argv[3]), seed=int(sys.argv[4]),
+             precision=float(sys.argv[5]))
+    elif len(sys.argv) == 5:
         main(num_floors=int(sys.argv[1]), num_elevators=int(sys.argv[2]), logic=int(sys.argv[3]), seed=int(sys.argv[4]))
     else:
         main()
@@ -0,0 +1,90 @@
+import math
+
+
+"""
+Small statistics helpers shared by the planner and the simulation run length control. Scipy is not a requirement of
+this project so the two sided 95% student t quantiles are kept in a table, for more than 30 degrees of freedom the
+normal approximation is close enough.
+"""
+__author__ = "Thomas McDonnell"
+__title__ = "Elevator Simulation"
+
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+        11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+        21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042}
+
+
+def t_quantile(df):
+    """
+    Two sided 95% student t quantile for the given degrees of freedom.
+
+    :param df:
+    :return: float
+    """
+    return T_95.get(df, 1.96)
+
+
+def confidence_interval(values):
+    """
+    Mean and 95% confidence half width of a sample of independent observations.
+
+    :param values:
+    :return: tuple: (mean, half width), the half width is infinite for fewer than two observations
+    """
+    n = len(values)
+    mean = sum(values) / n
+    if n < 2:
+        return mean, math.inf
+    variance = sum((x - mean) ** 2 for x in values) / (n - 1)
+    return mean, t_quantile(n - 1) * math.sqrt(variance / n)
+
+
+def lag1_autocorrelation(values):
+    """
+    Lag 1 autocorrelation of a series, batch means far enough apart to be treated as independent are close to zero.
+
+    :param values:
+    :return: float: 0 for a constant series
+    """
+    n = len(values)
+    mean = sum(values) / n
+    variance = sum((x - mean) ** 2 for x in values)
+    if variance == 0:
+        return 0.0
+    return sum((values[i] - mean) * (values[i + 1] - mean) for i in range(n - 1)) / variance
+
+
+def mser5(series):
+    """
+    MSER-5 truncation point of an output series. The series is averaged in batches of 5 and the truncation point is
+    the number of leading batches whose deletion minimises the squared standard error of the remaining batch means.
+    Only the first half of the series is searched, if the minimum falls on its end the series is too short to show
+    where the transient ends.
+
+    :param series:
+    :return: int: number of leading observations to delete, None if the series is too short
+    """
+    batches = [sum(series[i:i + 5]) / 5 for i in range(0, len(series) - 4, 5)]
+    k = len(batches)
+    if k < 4:
+        return None
+
+    # suffix sums so that each candidate truncation point costs O(1)
+    total = total_sq = 0.0
+    suffix = [None] * (k + 1)
+    suffix[k] = 0.0, 0.0
+    for i in range(k - 1, -1, -1):
+        total += batches[i]
+        total_sq += batches[i] ** 2
+        suffix[i] = total, total_sq
+
+    best_d, best = 0, math.inf
+    for d in range(k // 2 + 1):
+        n = k - d
+        s, sq = suffix[d]
+        statistic = (sq - s * s / n) / n ** 2
+        if statistic < best:
+            best_d, best = d, statistic
+    if best_d == k // 2:
+        return None
+    return best_d * 5
@@ -12,6 +12,7 @@ from tkinter.ttk import Progressbar
 from tkinter import messagebox
 
 from controller import Controller
+from simulation import Elevator
 
 import os
 
@@ -94,8 +95,8 @@ class ElevatorSimulationPage(tk.Frame):
         tk.Frame.__init__(self, parent)  # call parent constructor
         # simulation variables
         self.simulation_variables = dict(num_floors=10, num_elevators=1,
-                                         seed=12345678, logic=0)
-        self.input_text = ["Floors ....", "Elevators ....", "Seed value ...."]
+                                         seed=12345678, logic=0, precision=None)
+        self.input_text = ["Floors ....", "Elevators ....", "Seed value ....", "Precision ...."]
         self.cont = Controller()
         # set label for frame
         label = tk.Label(self, text="Simulation Arguments", font=LARGE_FONT)
@@ -131,11 +132,20 @@ class ElevatorSimulationPage(tk.Frame):
         self.seed.insert(0, self.input_text[2])
         self.seed.bind('<Button-1>', lambda x: self.on_click("self.seed.delete(0, '')"))
         self.seed.pack(pady=5, padx=5)
-        # system logic
-        self.varCk = False
-        self.chk = ttk.Checkbutton(self, text="Enhanced Simulation", variable=self.varCk,
-                                   command=lambda: self.on_tick())
-        self.chk.pack(pady=5, padx=5)
+        # precision
+        self.precision_l = ttk.Label(self, text="""The relative precision of the mean wait, e.g. 0.05 for 5%.
+        Runs the fixed warm up and duration if none provided.""")
+        self.precision_l.pack(pady=10, padx=10)
+        self.precision = ttk.Entry(self)
+        self.precision.insert(0, self.input_text[3])
+        self.precision.bind('<Button-1>', lambda x: self.on_click("self.precision.delete(0, '')"))
+        self.precision.pack(pady=5, padx=5)
+        # system logic, one radio button per registered strategy
+        self.logic = tk.IntVar(self, value=0)
+        self.logic_l = ttk.Label(self, text="The elevator logic. Defaults to standard if none selected.")
+        self.logic_l.pack(pady=10, padx=10)
+        for i, strategy in enumerate(Elevator.LOGIC):
+            ttk.Radiobutton(self, text=strategy.name, variable=self.logic, value=i).pack(pady=2, padx=5)
         # submit form
         self.btn_submit = ttk.Button(self, text="submit",
                                      command=self.btn_on_submit)
@@ -163,8 +173,12 @@ class ElevatorSimulationPage(tk.Frame):
             if ElevatorSimulationPage.check_input(val):
                 self.simulation_variables['seed'] = val
 
-        if self.varCk:
-            self.simulation_variables['logic'] = 1
+        val = self.precision.get()
+        if val and not any(val in x for x in self.input_text):
+            if ElevatorSimulationPage.check_precision(val):
+                self.simulation_variables['precision'] = val
+
+        self.simulation_variables['logic'] = self.logic.get()
 
         self.run_simulation()
 
@@ -172,7 +186,8 @@ class ElevatorSimulationPage(tk.Frame):
         self.cont.run_simulation(num_floors=self.simulation_variables['num_floors'],
                                  num_elevators=self.simulation_variables['num_elevators'],
                                  seed=self.simulation_variables['seed'],
-                                 logic=self.simulation_variables['logic'])
+                                 logic=self.simulation_variables['logic'],
+                                 precision=self.simulation_variables['precision'])
         self.reset_simulation_defaults()
         self.output()
 
@@ -199,13 +214,29 @@ class ElevatorSimulationPage(tk.Frame):
         else:
             return True
 
+    @staticmethod
+    def check_precision(val):
+        """
+        Checks validity of the precision. Values strictly between 0 and 1 return True, all else False with error
+        message.
+        :param val:
+        :return: boolean
+        """
+        try:
+            num = float(val)
+            if not 0 < num < 1:
+                messagebox.showerror("Precision Error", "Please enter a precision between 0 and 1.")
+                return False
+        except ValueError:
+            messagebox.showerror("Non-Float Error", "Please enter a decimal value.")
+            return False
+        else:
+            return True
+
     def on_click(self, exc):
         """function that gets called whenever entry is clicked"""
         eval(exc)
 
-    def on_tick(self):
-        self.varCk = True
-
     def reset_simulation_defaults(self):
         """Reset the default values for the simulation"""
         self.simulation_variables.clear()
@@ -213,6 +244,7 @@ class ElevatorSimulationPage(tk.Frame):
         self.simulation_variables['num_elevators'] = 1
         self.simulation_variables['seed'] = 12345678
         self.simulation_variables['logic'] = 0
+        self.simulation_variables['precision'] = None
         self.simulation_variables['is_default'] = True
 
 
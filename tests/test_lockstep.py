@@ -0,0 +1,45 @@
+import numpy as np
+
+import lockstep
+from lockstep import LockstepEngine
+
+
+def test_lowest_and_highest_levels():
+    calls = np.array([0b0100100100, 0b1, 1 << 9, 1 << 61, (1 << 61) | 1, (1 << 54) - 1, (1 << 62) - 1])
+    assert lockstep.lowest(calls).tolist() == [2, 0, 9, 61, 0, 0, 0]
+    # a float64 would round the last two up to the next power of two
+    assert lockstep.highest(calls).tolist() == [8, 0, 9, 61, 61, 53, 61]
+
+
+def test_engine_state_stays_consistent():
+    engine = LockstepEngine(200, num_floors=10, num_elevators=3, max_load=5, seed=1)
+    for _ in range(20):
+        engine.run(250)
+        riders = engine.riders.reshape(-1, engine.num_floors)
+        assert (engine.load == riders.sum(1)).all()
+        assert (engine.load <= engine.max_load).all()
+        levels = 1 << np.arange(engine.num_floors)
+        assert ((riders > 0) @ levels == engine.car_calls).all()
+        waiting = engine.waiting.reshape(2, engine.replications, engine.num_floors)
+        assert (waiting >= 0).all()
+        assert engine.arrived.sum() == engine.boarded.sum() + waiting.sum()
+        # everyone waiting has a call, except while an elevator that answered it is loading
+        serving = np.isin(engine.phase, (lockstep.OPENING, lockstep.LOADING))
+        answered = np.zeros((2, engine.replications), dtype=np.int64)
+        np.bitwise_or.at(answered, ((engine.direction[serving] == -1).astype(int), engine.row[serving]),
+                         1 << engine.position[serving])
+        for calls, queue, loading in zip((engine.calls_up, engine.calls_down), waiting, answered):
+            assert (((queue > 0) @ levels) & ~(calls | loading) == 0).all()
+
+
+def test_waits_are_recorded_for_everyone_boarded():
+    engine = LockstepEngine(100, num_floors=5, num_elevators=2, seed=2)
+    engine.run(1000)
+    engine.reset_monitors()
+    engine.run(5000)
+    results = engine.results()
+    assert results["people"].sum() == engine.boarded.sum() > 0
+    # nobody waits longer than the measured period plus the warm up
+    assert (engine.waits <= engine.boarded * engine.now).all()
+    assert np.nanmin(results["length_of_stay"]) >= 0
+    assert results["length"].min() >= 0
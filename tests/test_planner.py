@@ -0,0 +1,103 @@
+import math
+
+import pytest
+
+import planner
+from planner import CapacityPlanner
+
+
+class StubPool:
+    """Runs the work in process and records the size of every round"""
+    def __init__(self, *args):
+        self.rounds = []
+        self.terminated = False
+
+    def starmap(self, func, iterable):
+        batch = list(iterable)
+        self.rounds.append(len(batch))
+        return [func(*args) for args in batch]
+
+    def terminate(self):
+        self.terminated = True
+
+
+def fake_replicate(waits):
+    """A replicate() that looks the wait up by (num_elevators, max_load) and adds the seed as noise if asked"""
+    def replicate(num_floors, num_elevators, max_load, logic, iat, seed, warm_up, duration, percentile):
+        wait, noise = waits(num_elevators, max_load)
+        return wait + noise * (seed % 7)
+    return replicate
+
+
+def make_planner(monkeypatch, waits, **kwargs):
+    monkeypatch.setattr(planner, "replicate", fake_replicate(waits))
+    capacity = CapacityPlanner(num_floors=10, sla=30, processes=4, **kwargs)
+    capacity.pool = StubPool()
+    return capacity
+
+
+def test_clearly_infeasible_configuration_is_pruned_after_first_round(monkeypatch):
+    capacity = make_planner(monkeypatch, lambda n, load: (1000, 1))
+    config = capacity.evaluate(1, 8, 0)
+    assert capacity.pool.rounds == [3]
+    assert not config.feasible
+
+
+def test_nobody_picked_up_is_pruned_after_first_round(monkeypatch):
+    capacity = make_planner(monkeypatch, lambda n, load: (math.inf, 0))
+    config = capacity.evaluate(1, 8, 0)
+    assert capacity.pool.rounds == [3]
+    assert not config.feasible
+
+
+def test_rounds_double_up_to_the_pool_size(monkeypatch):
+    capacity = make_planner(monkeypatch, lambda n, load: (27, 1))  # interval keeps containing the sla
+    config = capacity.evaluate(2, 8, 0)
+    assert capacity.pool.rounds == [3, 4, 3]
+    assert len(config.samples) == capacity.replications
+
+
+def test_evaluations_are_cached(monkeypatch):
+    capacity = make_planner(monkeypatch, lambda n, load: (10, 0))
+    assert capacity.evaluate(3, 8, 0) is capacity.evaluate(3, 8, 0)
+    assert capacity.pool.rounds == [3]
+
+
+def test_bisect_finds_fewest_elevators(monkeypatch):
+    capacity = make_planner(monkeypatch, lambda n, load: (100 / n, 0))
+    assert capacity.bisect(8, 0, 10).num_elevators == 4
+    assert capacity.bisect(8, 0, 3) is None
+
+
+def test_plan_shrinks_upper_bound(monkeypatch):
+    monkeypatch.setattr(planner.multiprocessing, "Pool", StubPool)
+    capacity = make_planner(monkeypatch, lambda n, load: (100 / n if load == 4 else 50 / n, 0), max_loads=(8, 4))
+    cheapest = capacity.plan()
+    assert (cheapest.num_elevators, cheapest.max_load) == (2, 8)
+    # the larger car is searched with at most the elevators the smaller one needed
+    assert max(n for n, load, logic in capacity.evaluated if load == 8) == 4
+    assert capacity.pool is None
+
+
+def test_plan_releases_pool_on_error(monkeypatch):
+    pools = []
+
+    def pool(*args):
+        pools.append(StubPool())
+        return pools[-1]
+
+    def fail(*args):
+        raise RuntimeError("replication failed")
+
+    monkeypatch.setattr(planner.multiprocessing, "Pool", pool)
+    monkeypatch.setattr(planner, "replicate", fail)
+    capacity = CapacityPlanner(num_floors=10, sla=30, processes=4)
+    with pytest.raises(RuntimeError):
+        capacity.plan()
+    assert capacity.pool is None
+    assert pools[0].terminated
+
+
+def test_replications_must_be_positive():
+    with pytest.raises(ValueError):
+        CapacityPlanner(num_floors=10, sla=30, replications=0)
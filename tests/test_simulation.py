@@ -0,0 +1,75 @@
+import math
+
+import simulation
+from simulation import LookStrategy
+
+
+def test_ahead_masks_out_current_level_and_behind():
+    calls = 0b1010110101
+    assert LookStrategy.ahead(calls, 4, 1) == 0b1010100000
+    assert LookStrategy.ahead(calls, 4, -1) == 0b0000000101
+
+
+def test_ahead_at_bottom_and_top_levels():
+    calls = 0b1111111111
+    assert LookStrategy.ahead(calls, 0, -1) == 0
+    assert LookStrategy.ahead(calls, 0, 1) == 0b1111111110
+    assert LookStrategy.ahead(calls, 9, 1) == 0
+    assert LookStrategy.ahead(calls, 9, -1) == 0b0111111111
+
+
+def test_nearest_in_direction_of_travel():
+    calls = 0b0100100100
+    assert LookStrategy.nearest(calls, 1) == 2
+    assert LookStrategy.nearest(calls, -1) == 8
+
+
+def test_nearest_at_bottom_and_top_levels():
+    assert LookStrategy.nearest(1, 1) == 0
+    assert LookStrategy.nearest(1, -1) == 0
+    assert LookStrategy.nearest(1 << 9, 1) == 9
+    assert LookStrategy.nearest(1 << 9, -1) == 9
+
+
+def test_look_picks_everyone_up():
+    floors = simulation.run(num_floors=10, num_elevators=2, logic=2, seed=1, iat=10, warm_up=100, duration=5000)
+    for floor in floors.values():
+        monitor = floor.occupants.length_of_stay
+        assert monitor.number_of_entries() > 0
+        assert math.isfinite(monitor.maximum())
+        # nobody is left behind, whoever is still waiting arrived recently
+        for person in floor.occupants:
+            assert person.env.now() - person.enter_time(floor.occupants) < 1000
+
+
+def test_standard_turns_around_at_top_and_bottom(monkeypatch):
+    levels = []
+    move_to = simulation.Elevator.move_to
+
+    def record(elevator, destination, mode="Moving"):
+        levels.append(destination.level_n)
+        return move_to(elevator, destination, mode)
+
+    monkeypatch.setattr(simulation.Elevator, "move_to", record)
+    floors = simulation.run(num_floors=5, num_elevators=1, logic=0, seed=1, iat=10, warm_up=100, duration=2000)
+    assert set(levels) == set(floors)
+    assert all(elevator.position in floors.values() for elevator in simulation.elevators)
+
+
+def test_run_length_control_flags_overload():
+    # one car cannot keep up, the queues grow for the whole run
+    control = simulation.RunLengthControl(precision=0.1, max_warm_up=5000, max_duration=10000)
+    simulation.run(num_floors=10, num_elevators=1, seed=1, control=control)
+    assert not control.settled
+    assert not control.converged
+    assert control.warm_up == 5000
+    # the growing waits are correlated from batch to batch
+    assert control.batch > 1000
+
+
+def test_run_length_control_converges():
+    control = simulation.RunLengthControl(precision=0.2, max_warm_up=5000, max_duration=10000)
+    simulation.run(num_floors=10, num_elevators=4, seed=1, control=control)
+    assert control.settled
+    assert control.converged
+    assert control.half_width <= 0.2 * control.mean
@@ -0,0 +1,43 @@
+import math
+
+import stats
+
+
+def test_t_quantile_table_boundary():
+    assert stats.t_quantile(1) == 12.706
+    assert stats.t_quantile(30) == 2.042
+    assert stats.t_quantile(31) == 1.96
+
+
+def test_confidence_interval():
+    mean, half_width = stats.confidence_interval([1.0, 2.0, 3.0])
+    assert mean == 2.0
+    assert math.isclose(half_width, 4.303 * math.sqrt(1 / 3))
+
+
+def test_confidence_interval_single_observation():
+    assert stats.confidence_interval([5.0]) == (5.0, math.inf)
+
+
+def test_lag1_autocorrelation():
+    assert stats.lag1_autocorrelation([1.0, 2.0] * 10) == -0.95
+    assert stats.lag1_autocorrelation([float(i) for i in range(10)]) > 0.5
+    assert stats.lag1_autocorrelation([3.0] * 10) == 0.0
+
+
+def test_mser5_flat_series_keeps_everything():
+    assert stats.mser5([1.0, 2.0] * 50) == 0
+
+
+def test_mser5_truncates_known_transient():
+    # 20 observations far from the steady state, then an alternating steady state
+    series = [100.0] * 20 + [1.0, 2.0] * 90
+    assert stats.mser5(series) == 20
+
+
+def test_mser5_too_short():
+    assert stats.mser5([1.0] * 19) is None
+
+
+def test_mser5_trend_never_settles():
+    assert stats.mser5([float(i) for i in range(100)]) is None